@@ -6,13 +6,19 @@ and adds more robust handling for empty strings in fields like 'hourly_rate'. Th
 pipeline remains, making it easy to follow and maintain.
 """
 
+import numpy as np
 import pandas as pd
 import argparse
+import functools
 import gspread
 import json
+import re
 import os  # Import the 'os' module
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 # ---------------------------
 # Constants & Configurations
@@ -34,6 +40,17 @@ COLUMN_MAP = {
 
 TAG_COLUMNS = [f'air3-token' if i == 1 else f'air3-token {i}' for i in range(1, 9)]
 
+CATEGORICAL_COLUMNS = ['payment_verified', 'skill_level', 'country']
+
+SKILL_SCORES = {'Expert': 3, 'Intermediate': 2}  # Any other level scores 1
+
+# Compiled once so repeated transform_data calls don't re-compile them
+NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+BUDGET_RE = re.compile(r'\$([\d,]+)')
+NON_NUMERIC_RE = re.compile(r'[^\d.]')
+
+WRITE_BUFFER_SIZE = 1 << 20  # 1 MiB, so large outputs need few write() syscalls
+
 SCORE_WEIGHTS = {
     'total_spent': 0.4,
     'proposed_rate': 0.25,
@@ -42,13 +59,27 @@ SCORE_WEIGHTS = {
     'time_commitment': 0.1
 }
 
+# Explicit component order shared by the weight vector and the stacked components
+SCORE_COMPONENTS = ['total_spent', 'proposed_rate', 'rating', 'skill_level', 'time_commitment']
+
+# The weights in SCORE_COMPONENTS order
+SCORE_WEIGHT_VECTOR = np.array([SCORE_WEIGHTS[name] for name in SCORE_COMPONENTS])
+
 # ---------------------------
 # Core Functionality
 # ---------------------------
 def load_data(input_csv: str) -> pd.DataFrame:
-    """Load and validate CSV data with robust error handling."""
+    """Load and validate CSV data with robust error handling.
+
+    Parses with pyarrow's multithreaded engine but keeps NumPy-backed dtypes,
+    which the .str extraction in convert_numerics relies on.
+    """
     try:
-        return pd.read_csv(input_csv, sep='\t')
+        # pyarrow raises a ParserError for files with no data, and blank-line-only
+        # input aborts its reader threads at shutdown, so detect those up front
+        if _is_blank(input_csv):
+            raise pd.errors.EmptyDataError
+        return pd.read_csv(input_csv, sep='\t', engine='pyarrow')
     except FileNotFoundError:
         exit(f"Error: Input file not found at {input_csv}")
     except pd.errors.EmptyDataError:
@@ -56,42 +87,79 @@ def load_data(input_csv: str) -> pd.DataFrame:
     except pd.errors.ParserError:
         exit(f"Error: Malformed data in {input_csv}")
 
+def _is_blank(path: str) -> bool:
+    """Return True if the file is empty or holds nothing but whitespace.
+
+    Reading stops at the first chunk with any content, so a real data file
+    costs a single small read.
+    """
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            if chunk.strip():
+                return False
+    return True
+
 def transform_data(df: pd.DataFrame) -> pd.DataFrame:
     """Perform all data transformations in a single pipeline."""
     return (df
             .pipe(select_and_rename_columns)
+            .pipe(convert_categoricals)
             .pipe(process_tags)
             .pipe(convert_numerics)
             .pipe(filter_valid_rows)
             .pipe(calculate_scores)
-            .pipe(clean_strings)
     )
 
 def select_and_rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Select and rename required columns."""
     return df[list(COLUMN_MAP) + TAG_COLUMNS].rename(columns=COLUMN_MAP)
 
+def convert_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """Store low-cardinality string columns as categoricals.
+
+    Filtering and scoring then work on their small integer codes.
+    """
+    return df.astype({col: 'category' for col in CATEGORICAL_COLUMNS})
+
 def process_tags(df: pd.DataFrame) -> pd.DataFrame:
-    """Consolidate tag columns into a single list."""
+    """Consolidate tag columns into a single comma-separated string."""
+    # Mask missing tags over the raw 2-D array in one pass. The result is a plain
+    # string so the Arrow CSV writer and Google Sheets can store it in one cell.
+    # pyarrow infers int, float or bool for sparse tag columns that happen to look
+    # numeric or boolean, so every tag is converted to str before joining.
+    tags = df[TAG_COLUMNS].to_numpy(dtype=object)
+    present = pd.notna(tags)
     return df.assign(
-        tags=df[TAG_COLUMNS].apply(lambda x: x.dropna().tolist(), axis=1)
+        tags=[', '.join(map(str, row[mask])) for row, mask in zip(tags, present)]
     ).drop(columns=TAG_COLUMNS)
 
 def convert_numerics(df: pd.DataFrame) -> pd.DataFrame:
-    """Convert all numeric columns using vectorized operations."""
+    """Convert all numeric columns using vectorized operations.
+
+    The converted columns replace the originals in df itself, which is safe
+    because transform_data only passes the new frame returned by process_tags.
+    """
     # Convert rating (extract numeric part), hourly_rate, and estimated_budget robustly.
-    df = df.copy()
     df['rating'] = pd.to_numeric(
-        df['rating'].str.extract(r'(\d+\.?\d*)')[0],
+        df['rating'].str.extract(NUMBER_RE)[0],
         errors='coerce'
     ).fillna(0)
     
-    df['total_spent_by_client'] = df['total_spent_by_client'].apply(parse_currency)
+    # For total_spent_by_client, scale the numeric part by its K/M suffix
+    # (e.g. '$5K' or '$3.2M'); missing or unparseable values become 0.
+    spent = df['total_spent_by_client'].fillna('$0').str
+    df['total_spent_by_client'] = pd.to_numeric(
+        spent.extract(NUMBER_RE)[0],
+        errors='coerce'
+    ).fillna(0) * np.where(
+        spent.contains('K', regex=False), 1_000.0,
+        np.where(spent.contains('M', regex=False), 1_000_000.0, 1.0)
+    )
     
     # For estimated_budget, remove commas and convert
     df['estimated_budget'] = pd.to_numeric(
         df['estimated_budget']
-          .str.extract(r'\$([\d,]+)')[0]
+          .str.extract(BUDGET_RE)[0]
           .str.replace(',', '', regex=False),
         errors='coerce'
     ).fillna(0)
@@ -100,36 +168,41 @@ def convert_numerics(df: pd.DataFrame) -> pd.DataFrame:
     # Also, replace empty strings (if any) with '0' before converting.
     df['hourly_rate'] = pd.to_numeric(
         df['hourly_rate']
-          .str.replace(r'[^\d.]', '', regex=True)
+          .str.replace(NON_NUMERIC_RE, '', regex=True)
           .replace('', '0'),
         errors='coerce'
     ).fillna(0)
     
     return df
 
-def parse_currency(value: str) -> float:
-    """Parse currency values with K/M suffixes.
-    
-    Converts strings like '$5K' or '$3.2M' into their float representations.
-    """
-    if pd.isna(value) or value == '$0':
-        return 0.0
-    value = value.replace('$', '').replace('+', '')
-    multiplier = 1
-    if 'K' in value:
-        multiplier = 1000
-        value = value.replace('K', '')
-    elif 'M' in value:
-        multiplier = 1_000_000
-        value = value.replace('M', '')
-    try:
-        return float(value) * multiplier
-    except ValueError:
-        return 0.0
-
 def filter_valid_rows(df: pd.DataFrame) -> pd.DataFrame:
     """Filter rows based on business rules."""
-    return df.query("payment_verified == 'Payment verified' and total_spent_by_client > 0")
+    # Match rows on the categorical code for 'Payment verified'. -2 is never a
+    # valid code, so no rows match if that category is absent.
+    payment = df['payment_verified'].cat
+    verified = (
+        payment.categories.get_loc('Payment verified')
+        if 'Payment verified' in payment.categories else -2
+    )
+    mask = (payment.codes.to_numpy() == verified) & (df['total_spent_by_client'].to_numpy() > 0)
+    return df[mask]
+
+def _normalize(values: np.ndarray, maximum: float) -> np.ndarray:
+    """Scale values by their column maximum.
+
+    A zero maximum (e.g. no parseable hourly rate in an all fixed-price batch)
+    makes the component contribute 0 to the score rather than NaN.
+    """
+    return np.divide(values, maximum, out=np.zeros(len(values)), where=maximum != 0)
+
+def _weighted_score(components: dict) -> np.ndarray:
+    """Combine the normalized score components with one dot product.
+
+    components maps each SCORE_COMPONENTS name to its normalized array; they are
+    stacked in that order into an (N, 5) array and multiplied by SCORE_WEIGHT_VECTOR,
+    avoiding a temporary array per weighted term.
+    """
+    return np.stack([components[name] for name in SCORE_COMPONENTS], axis=1) @ SCORE_WEIGHT_VECTOR
 
 def calculate_scores(df: pd.DataFrame) -> pd.DataFrame:
     """Calculate golden scores using vectorized operations."""
@@ -139,43 +212,53 @@ def calculate_scores(df: pd.DataFrame) -> pd.DataFrame:
     max_total = df['total_spent_by_client'].max()
     max_rate = df['hourly_rate'].max() * 120  # 30 hrs/week * 4 weeks
     
-    # Calculate components for scoring.
+    # Calculate components for scoring as plain NumPy arrays.
     # Here, we assume that estimated_time contains '30+' if the project is high commitment.
-    time_multiplier = (
-        df['estimated_time'].str.contains('30+', na=False)
-        .map({True: 30, False: 15})
-        .astype('int64')  # Explicit type conversion
-        * 4
+    is_high_commitment = (
+        df['estimated_time'].str.contains('30+', regex=False, na=False).to_numpy()
     )
-    skill_scores = df['skill_level'].map({'Expert': 3, 'Intermediate': 2}).fillna(1)
-    time_scores = df['estimated_time'].str.contains('30+').astype(int) + 1
-    
-    # Form normalized scores for each component.
-    norms = pd.DataFrame({
-        'total_spent': df['total_spent_by_client'] / max_total,
-        'proposed_rate': (df['hourly_rate'] * time_multiplier) / max_rate,
-        'rating': df['rating'] / 5,
+    monthly_hours = np.where(is_high_commitment, 120, 60)  # 30 or 15 hrs/week * 4 weeks
+    proposed_rate = df['hourly_rate'].to_numpy() * monthly_hours
+    # Score each skill category once and index by code; missing levels (code -1)
+    # pick up the trailing default of 1.
+    skill_levels = df['skill_level'].cat
+    skill_lookup = np.append(skill_levels.categories.map(SKILL_SCORES).fillna(1), 1)
+    skill_scores = skill_lookup[skill_levels.codes.to_numpy()]
+    time_scores = is_high_commitment.astype(np.int8) + 1
+
+    # Compute the final score as a single weighted sum over the normalized components,
+    # round to 2 decimals, then scale to a 0-100 score.
+    score = _weighted_score({
+        'total_spent': _normalize(df['total_spent_by_client'].to_numpy(), max_total),
+        'proposed_rate': _normalize(proposed_rate, max_rate),
+        'rating': df['rating'].to_numpy() / 5,
         'skill_level': skill_scores / 3,
-        'time_commitment': time_scores / 2
+        'time_commitment': time_scores / 2,
     })
-    
-    # Compute the final score using a weighted sum on normalized components,
-    # round to 2 decimals, then scale to a 0-100 score.
-    df['golden_score'] = (norms * pd.Series(SCORE_WEIGHTS)).sum(axis=1).round(2) * 100
-    return df.sort_values('golden_score', ascending=False)
+    golden_score = np.round(score, 2) * 100
+    df['golden_score'] = golden_score
 
-def clean_strings(df: pd.DataFrame) -> pd.DataFrame:
-    """Escape double quotes in string columns as per RFC 4180."""
-    str_cols = df.select_dtypes(include='object').columns
-    df[str_cols] = df[str_cols].apply(lambda x: x.str.replace('"', '""', regex=False))
-    return df
+    # Sort descending on the raw array; negating keeps NaN scores last and a
+    # stable sort keeps ties in their original order.
+    return df.iloc[np.argsort(-golden_score, kind='stable')]
 
 def save_data(df: pd.DataFrame, output_csv: str) -> None:
-    """Save the transformed data to CSV with proper formatting."""
-    df.to_csv(output_csv, index=False, quoting=1, quotechar='"', encoding='utf-8')
+    """Save the transformed data to CSV with proper formatting.
+
+    Uses pyarrow's C++ CSV writer, quoting every value. It doubles embedded
+    quotes per RFC 4180, so strings are written as-is.
+    """
+    with pa.output_stream(output_csv, buffer_size=WRITE_BUFFER_SIZE) as out:
+        pacsv.write_csv(
+            pa.Table.from_pandas(df, preserve_index=False),
+            out,
+            write_options=pacsv.WriteOptions(quoting_style='all_valid')
+        )
 
 # --- Google Sheets Integration ---
+@functools.lru_cache(maxsize=None)
 def connect_to_google_sheets():
+    """Load the service account credentials once and return them with a gspread client."""
     credentials = service_account.Credentials.from_service_account_file(
         'google_creds.json',
         # Add drive scope for file creation/sharing
@@ -184,22 +267,27 @@ def connect_to_google_sheets():
             'https://www.googleapis.com/auth/drive'
         ]
     )
-    return gspread.authorize(credentials)
+    return credentials, gspread.authorize(credentials)
+
+def _cell_data(value) -> dict:
+    """Wrap a cleaned value as Sheets CellData.
+
+    Strings go in as stringValue, so they are stored as-is and never parsed as
+    formulas or numbers; empty values produce an empty cell.
+    """
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    if value == '':
+        return {}
+    return {'userEnteredValue': {'stringValue': str(value)}}
 
 def save_to_google_sheets(df: pd.DataFrame, spreadsheet_name: str, worksheet_name: str = 'Sheet1', user_email: str = None):
     """Saves the DataFrame to a Google Sheet using official Google API methods."""
     try:
-        # Update scopes here too
-        credentials = service_account.Credentials.from_service_account_file(
-            'google_creds.json',
-            scopes=[
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive'
-            ]
-        )
-        
-        # Initialize client and drive service with same credentials
-        gc = gspread.authorize(credentials)
+        # Reuse the cached credentials and client for the drive service
+        credentials, gc = connect_to_google_sheets()
         drive_service = build('drive', 'v3', credentials=credentials)
 
         # Spreadsheet handling
@@ -224,12 +312,28 @@ def save_to_google_sheets(df: pd.DataFrame, spreadsheet_name: str, worksheet_nam
                 cols=max(df.shape[1]+1, 20)
             )
 
-        # Data upload
-        worksheet.clear()
-        worksheet.update(
-            [df.columns.values.tolist()] + df.fillna('').values.tolist(),
-            value_input_option='USER_ENTERED'
-        )
+        # Data upload: convert the frame once (categorical columns can't be filled
+        # with '' in place), then grow the grid if needed, clear it and write every
+        # row in a single spreadsheets.batchUpdate, whose requests apply in order.
+        values = [df.columns.tolist()] + df.astype(object).where(df.notna(), '').values.tolist()
+        sh.batch_update({'requests': [
+            {'updateSheetProperties': {
+                'properties': {
+                    'sheetId': worksheet.id,
+                    'gridProperties': {
+                        'rowCount': max(worksheet.row_count, len(values)),
+                        'columnCount': max(worksheet.col_count, df.shape[1])
+                    }
+                },
+                'fields': 'gridProperties.rowCount,gridProperties.columnCount'
+            }},
+            {'updateCells': {'range': {'sheetId': worksheet.id}, 'fields': 'userEnteredValue'}},
+            {'updateCells': {
+                'start': {'sheetId': worksheet.id, 'rowIndex': 0, 'columnIndex': 0},
+                'rows': [{'values': [_cell_data(value) for value in row]} for row in values],
+                'fields': 'userEnteredValue'
+            }}
+        ]})
 
         # User sharing
         if user_email:
@@ -244,6 +348,8 @@ def save_to_google_sheets(df: pd.DataFrame, spreadsheet_name: str, worksheet_nam
 
     except gspread.exceptions.APIError as e:  # Corrected exception
         print(f"Google API Error: {e.response.json()['error']['message']}")
+    except HttpError as e:
+        print(f"Google API Error: {e.reason}")
     except Exception as e:
         print(f"General Error: {str(e)}")
 